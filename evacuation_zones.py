@@ -0,0 +1,241 @@
+"""Evacuation zone lookup and geocoding helpers for the Streamlit app"""
+import streamlit as st
+import requests
+import orjson
+import numpy as np
+import shapely
+from shapely.geometry import shape
+from shapely.strtree import STRtree
+from scipy.spatial import cKDTree
+import pyproj
+import googlemaps
+from collections import namedtuple
+
+Location = namedtuple("Location", ["latitude", "longitude"])
+ZoneIndex = namedtuple(
+    "ZoneIndex",
+    [
+        "polygons", "properties", "tree", "is_warning", "has_vertices",
+        "projected_boundaries", "projected_bounds", "vertex_tree", "vertex_zones",
+    ]
+)
+
+def meters_to_miles(meters):
+    """Convert meters to miles"""
+    return meters * 0.000621371
+
+geod = pyproj.Geod(ellps="WGS84")
+
+# California Albers keeps distances in meters with little distortion across the state
+to_albers = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3310", always_xy=True)
+from_albers = pyproj.Transformer.from_crs("EPSG:3310", "EPSG:4326", always_xy=True)
+
+def project_coords(coords):
+    """Project an (N, 2) array of lon/lat coordinates to California Albers"""
+    return np.column_stack(to_albers.transform(coords[:, 0], coords[:, 1]))
+
+def geodesic_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points in miles on the WGS84 ellipsoid"""
+    _, _, meters = geod.inv(lon1, lat1, lon2, lat2)
+    return meters_to_miles(meters)
+
+def build_zone_index(geojson_data):
+    """Parse the zone polygons once and index them with an STRtree"""
+    polygons = []
+    properties = []
+    for feature in geojson_data["features"]:
+        try:
+            polygon = shape(feature["geometry"])
+        except (ValueError, AttributeError):
+            # Skip invalid geometries
+            continue
+        if polygon.is_empty:
+            continue
+        polygons.append(polygon)
+        properties.append(feature["properties"])
+
+    polygons = np.array(polygons, dtype=object)
+    # Prepared polygons answer the repeated containment tests from an internal index
+    shapely.prepare(polygons)
+    is_warning = np.array([p.get("zone_status", "") == "Evacuation Warning" for p in properties], dtype=bool)
+
+    # Project the boundaries once here so each lookup only has to project its point
+    projected_boundaries = shapely.transform(shapely.boundary(polygons), project_coords)
+
+    # Index every projected boundary vertex, remembering which zone it belongs to
+    vertex_coords, vertex_zones = shapely.get_coordinates(projected_boundaries, return_index=True)
+
+    # Points and geometry collections have no boundary vertices, so they can't be measured to
+    has_vertices = np.isin(np.arange(len(polygons)), vertex_zones)
+    is_warning &= has_vertices
+
+    return ZoneIndex(
+        polygons=polygons,
+        properties=properties,
+        # Built from the whole array in one sort-tile-recursive pass, never by repeated inserts
+        tree=STRtree(polygons),
+        is_warning=is_warning,
+        has_vertices=has_vertices,
+        projected_boundaries=projected_boundaries,
+        projected_bounds=shapely.bounds(projected_boundaries),
+        vertex_tree=cKDTree(vertex_coords),
+        vertex_zones=vertex_zones,
+    )
+
+def bounds_distance(x, y, bounds):
+    """Distance from a point to each (minx, miny, maxx, maxy) box, a lower bound on the distance to its geometry"""
+    dx = np.maximum(np.maximum(bounds[:, 0] - x, x - bounds[:, 2]), 0)
+    dy = np.maximum(np.maximum(bounds[:, 1] - y, y - bounds[:, 3]), 0)
+    return np.hypot(dx, dy)
+
+def nearest_eligible_vertex(zone_index, x, y, eligible):
+    """Find the nearest boundary vertex of an eligible zone to a projected point
+
+    Returns the distance in meters and the zone the vertex belongs to.
+    """
+    k = 8
+    while True:
+        # Widen the search until one of the nearest vertices belongs to an eligible zone
+        k = min(k, zone_index.vertex_tree.n)
+        if k == 0:
+            break
+        distances, vertices = map(np.atleast_1d, zone_index.vertex_tree.query((x, y), k=k))
+        hits = eligible[zone_index.vertex_zones[vertices]]
+        if hits.any():
+            nearest = np.argmax(hits)
+            return distances[nearest], zone_index.vertex_zones[vertices[nearest]]
+        if k == zone_index.vertex_tree.n:
+            break
+        k *= 8
+    raise ValueError("No eligible zone has a boundary vertex")
+
+def nearest_zone_boundary(lat, lon, zone_index, point_projected, eligible):
+    """Find the eligible zone whose boundary is nearest the point
+
+    Returns the zone's index and the geodesic distance in miles to its boundary.
+    """
+    # The nearest eligible vertex lies on a boundary, so no closer boundary can be further away
+    x, y = point_projected.x, point_projected.y
+    radius, seed = nearest_eligible_vertex(zone_index, x, y, eligible)
+    lower_bounds = bounds_distance(x, y, zone_index.projected_bounds)
+    # The radius and the box bounds are rounded differently, so keep the seed zone explicitly
+    candidates = eligible & (lower_bounds <= radius)
+    candidates[seed] = True
+    candidates = np.flatnonzero(candidates)
+
+    # One vectorized call gives each candidate's distance and nearest boundary point
+    lines = shapely.shortest_line(zone_index.projected_boundaries[candidates], point_projected)
+    best = np.argmin(shapely.length(lines))
+    closest, closest_line = candidates[best], lines[best]
+
+    # Measure to the nearest boundary point on the ellipsoid rather than in the projection
+    boundary_lon, boundary_lat = from_albers.transform(*closest_line.coords[0])
+    return closest, geodesic_distance(lat, lon, boundary_lat, boundary_lon)
+
+def find_containing_zones(lats, lons, zone_index):
+    """Find the first zone, in file order, containing each point, or -1 where none does"""
+    containing = np.full(len(lats), -1)
+
+    # Pair every point with the zones whose bounding box holds it, then test all pairs in one call
+    point_ids, zone_ids = zone_index.tree.query(shapely.points(lons, lats))
+    inside = shapely.contains_xy(zone_index.polygons[zone_ids], lons[point_ids], lats[point_ids])
+    point_ids, zone_ids = point_ids[inside], zone_ids[inside]
+
+    # First match wins: keep the lowest zone index for each point
+    order = np.lexsort((zone_ids, point_ids))
+    points, first = np.unique(point_ids[order], return_index=True)
+    containing[points] = zone_ids[order][first]
+    return containing
+
+def find_location_zones(lat, lon, point_projected, zone_index, containing):
+    closest_distance = float('inf')
+    closest_zone = None
+    closest_warning_distance = float('inf')
+    closest_warning_zone = None
+
+    # A point inside a zone is reported by that zone alone, so the distance searches are skipped
+    if containing >= 0:
+        zone = zone_index.properties[containing]
+        return zone, closest_distance, closest_zone, closest_warning_distance, closest_warning_zone
+
+    # No zone contains the point, so every zone with a boundary counts towards the closest distance
+    if zone_index.has_vertices.any():
+        closest, closest_distance = nearest_zone_boundary(
+            lat, lon, zone_index, point_projected, zone_index.has_vertices
+        )
+        closest_zone = zone_index.properties[closest]
+
+    if zone_index.is_warning.any():
+        closest_warning, closest_warning_distance = nearest_zone_boundary(
+            lat, lon, zone_index, point_projected, zone_index.is_warning
+        )
+        closest_warning_zone = zone_index.properties[closest_warning]
+
+    return None, closest_distance, closest_zone, closest_warning_distance, closest_warning_zone
+
+def find_evacuation_zones(locations, zone_index):
+    """Look up the zones for each location, testing containment for all of them at once"""
+    lats = np.array([location.latitude for location in locations], dtype=float)
+    lons = np.array([location.longitude for location in locations], dtype=float)
+    containing_zones = find_containing_zones(lats, lons, zone_index)
+
+    # One call through the shared transformer projects every point
+    points_projected = shapely.points(*to_albers.transform(lons, lats))
+    return [
+        find_location_zones(lat, lon, point_projected, zone_index, containing)
+        for lat, lon, point_projected, containing in zip(lats, lons, points_projected, containing_zones)
+    ]
+
+# Last downloaded zone index and its ETag for each URL, kept across cache refreshes
+last_downloads = {}
+
+@st.cache_resource(ttl=300)
+def load_zones(geojson_url):
+    """Download the evacuation zones and index them, reusing the result for five minutes
+
+    Once the five minutes are up the download is conditional on the last ETag, so zones
+    that haven't changed are neither sent again nor re-indexed.
+    """
+    # requests decodes Brotli when the brotli package is installed
+    headers = {"Accept-Encoding": "br, gzip"}
+    last_download = last_downloads.get(geojson_url)
+    if last_download:
+        headers["If-None-Match"] = last_download[0]
+
+    response = requests.get(geojson_url, headers=headers)
+    if response.status_code == 304:
+        return last_download[1]
+
+    zone_index = build_zone_index(orjson.loads(response.content))
+    if response.headers.get("ETag"):
+        last_downloads[geojson_url] = (response.headers["ETag"], zone_index)
+    return zone_index
+
+# Cached geocoding (runs in worker threads, so no spinner). API errors propagate out of it so a
+# transient failure such as OVER_QUERY_LIMIT is never cached
+@st.cache_data(show_spinner=False)
+def geocode_address(address):
+    gmaps = googlemaps.Client(key=st.secrets["GOOGLE_MAPS_API_KEY"])
+
+    geocode_result = gmaps.geocode(address)
+    if geocode_result:
+        location = geocode_result[0]['geometry']['location']
+        latitude = location['lat']
+        longitude = location['lng']
+        return Location(latitude=latitude, longitude=longitude)
+    else:
+        print(f"Geocoding failed for address: {address}, no results found")
+        return None
+
+# Geocoding function
+def locate_property(address):
+    api_key = st.secrets["GOOGLE_MAPS_API_KEY"]
+    if not api_key:
+        print("Error: GOOGLE_MAPS_API_KEY environment variable not set.")
+        return None
+
+    try:
+        return geocode_address(address)
+    except googlemaps.exceptions.ApiError as e:
+        print(f"Geocoding error for address: {address}. API Error: {e}")
+        return None
@@ -1,108 +1,9 @@
 import streamlit as st
-import requests
-import json
-import time
-from shapely.geometry import Point, shape
-from math import radians, cos, sin, sqrt, atan2
-from geopy.geocoders import Nominatim
 from datetime import datetime
+import numpy as np
 import pandas as pd
-from shapely.ops import transform
-import pyproj
-import googlemaps
-from collections import namedtuple
-
-Location = namedtuple("Location", ["latitude", "longitude"])
-
-def haversine(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in miles using the haversine formula"""
-    R = 3958.8  # Radius of Earth in miles
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-def meters_to_miles(meters):
-    """Convert meters to miles"""
-    return meters * 0.000621371
-
-def find_evacuation_zones(lat, lon, geojson_data):
-    point = Point(lon, lat)
-    matching_zones = []
-    closest_distance = float('inf')
-    closest_zone = None
-    closest_warning_distance = float('inf')
-    closest_warning_zone = None
-
-    # Create a local projection centered on the point of interest
-    local_azimuthal_projection = pyproj.Proj(
-        proj='aeqd',  # Azimuthal Equidistant projection
-        lat_0=lat,
-        lon_0=lon,
-        datum='WGS84'
-    )
-    wgs84 = pyproj.Proj('EPSG:4326')
-    project = pyproj.Transformer.from_proj(wgs84, local_azimuthal_projection, always_xy=True).transform
-
-    # Project the point
-    point_projected = transform(project, point)
-
-    for feature in geojson_data["features"]:
-        try:
-            polygon = shape(feature["geometry"])
-            zone_status = feature["properties"].get("zone_status", "")
-            
-            # Project the polygon
-            polygon_projected = transform(project, polygon)
-            
-            if polygon.contains(point):
-                matching_zones.append(feature["properties"])
-            else:
-                # Calculate distance using haversine for more stability
-                boundary_points = list(polygon.exterior.coords)
-                min_distance = float('inf')
-                
-                for boundary_point in boundary_points:
-                    dist = haversine(lat, lon, boundary_point[1], boundary_point[0])
-                    min_distance = min(min_distance, dist)
-                
-                if min_distance < closest_distance:
-                    closest_distance = min_distance
-                    closest_zone = feature["properties"]
-                if zone_status == "Evacuation Warning" and min_distance < closest_warning_distance:
-                    closest_warning_distance = min_distance
-                    closest_warning_zone = feature["properties"]
-
-        except (ValueError, AttributeError) as e:
-            # Skip invalid geometries
-            continue
-
-    return matching_zones, closest_distance, closest_zone, closest_warning_distance, closest_warning_zone
-
-# Geocoding function
-def locate_property(address):
-    api_key = st.secrets["GOOGLE_MAPS_API_KEY"]
-    if not api_key:
-        print("Error: GOOGLE_MAPS_API_KEY environment variable not set.")
-        return None
-
-    gmaps = googlemaps.Client(key=api_key)
-
-    try:
-        geocode_result = gmaps.geocode(address)
-        if geocode_result:
-            location = geocode_result[0]['geometry']['location']
-            latitude = location['lat']
-            longitude = location['lng']
-            return Location(latitude=latitude, longitude=longitude)
-        else:
-            print(f"Geocoding failed for address: {address}, no results found")
-            return None
-    except googlemaps.exceptions.ApiError as e:
-        print(f"Geocoding error for address: {address}. API Error: {e}")
-        return None
+from concurrent.futures import ThreadPoolExecutor
+from evacuation_zones import find_evacuation_zones, load_zones, locate_property
 
 # Streamlit App
 st.title("SoCal Wildfire Evacuation/Warning Zone Finder")
@@ -118,15 +19,23 @@ if st.button("Check Zones"):
     elif len(addresses) > 10:
        st.warning("Please enter a maximum of 10 addresses.")
     else:
-        # Fetch the GeoJSON file
+        # GeoJSON file of current zones (cached between runs by load_zones)
         geojson_url = "https://static01.nyt.com/projects/weather/weather-bots/cal-fire-evacuations/latest.json"
-        response = requests.get(geojson_url)
-        geojson_data = response.json()
+
+        # Geocode the addresses concurrently; each lookup spends its time waiting on the network,
+        # and the zone download and indexing overlap with them on this thread
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            locations = executor.map(locate_property, addresses[:10])
+            zone_index = load_zones(geojson_url)
+            locations = list(locations)
+
+        # Look up the zones for every geocoded address in one batch
+        located = [location for location in locations if location]
+        zone_lookups = dict(zip(located, find_evacuation_zones(located, zone_index)))
 
         results = []
 
-        for address in addresses[:10]:
-            location = locate_property(address)
+        for address, location in zip(addresses[:10], locations):
             if not location:
                 results.append({
                     "Address": address,
@@ -146,11 +55,9 @@ if st.button("Check Zones"):
                 })
                 continue
 
-            latitude, longitude = location.latitude, location.longitude
-            matching_zones, closest_distance, closest_zone, closest_warning_distance, closest_warning_zone = find_evacuation_zones(latitude, longitude, geojson_data)
+            zone, closest_distance, closest_zone, closest_warning_distance, closest_warning_zone = zone_lookups[location]
 
-            if matching_zones:
-                zone = matching_zones[0]
+            if zone is not None:
                 last_updated = datetime.fromtimestamp(zone["last_updated"] / 1000).strftime("%Y-%m-%d %H:%M:%S") if zone.get("last_updated") else None
                 results.append({
                     "Address": address,
@@ -189,24 +96,16 @@ if st.button("Check Zones"):
         # Convert results to a DataFrame
         df = pd.DataFrame(results)
         
-        # Streamlit Styling with Conditional Formatting
-        def highlight_evacuation_zone(val):
-            if val == "Yes":
-                return "color: red; font-weight: bold;"
-            return ""
-        
-        def highlight_evacuation_warning(val):
-            if val == "Yes":
-                return "color: red; font-weight: bold;"
-            return ""
+        # Streamlit Styling with Conditional Formatting, applied a whole column at a time
+        def highlight_yes(column):
+            return np.where(column == "Yes", "color: red; font-weight: bold;", "")
 
         # Apply styles
-        styled_df = df.style.applymap(highlight_evacuation_zone, subset=["Evacuation Zone"])
-        styled_df = styled_df.applymap(highlight_evacuation_warning, subset=["Evacuation Warning"])
+        styled_df = df.style.apply(highlight_yes, subset=["Evacuation Zone", "Evacuation Warning"])
 
         # Display with styled text
         st.write("Results:")
         st.dataframe(styled_df, use_container_width=True)
 
 st.write("Evacuation Zone Source: NY Times")
-st.write("Geocoding Source: OpenStreetMap")
+st.write("Geocoding Source: Google Maps")